@@ -12,9 +12,15 @@
  * License: MIT
  */
 
+#ifdef __linux__
+#define _GNU_SOURCE   /* For sched_setaffinity, CPU_SET */
+#endif
+
 #include <gst/gst.h>
 #include <gst/app/gstappsink.h>
 #include <gst/app/gstappsrc.h>
+#include <gst/video/video.h>
+#include <gio/gio.h>  /* For GSocket (udpsrc used-socket) */
 #include <stdio.h>
 #include <stdlib.h>   /* For atoi, strtoull */
 #include <string.h>
@@ -22,6 +28,11 @@
 #include <unistd.h>   /* For standard POSIX definitions */
 #include <signal.h>   /* For signal, SIGINT */
 #include <getopt.h>
+#include <sys/socket.h>  /* For SO_RCVBUF, SO_RCVBUFFORCE */
+#include <errno.h>
+#ifdef __linux__
+#include <sched.h>    /* For sched_setaffinity */
+#endif
 
 /* ========== Version ========== */
 #define VERSION "1.1.0"
@@ -49,6 +60,7 @@
 
 /* Appsink/Appsrc defaults */
 #define DEFAULT_APPSINK_MAX_BUFFERS 2
+#define DEFAULT_APPSRC_MAX_BUFFERS  3           /* Frames queued ahead of the encoder */
 #define DEFAULT_STATS_INTERVAL_SEC  5
 
 /* Encoder defaults */
@@ -63,7 +75,10 @@
 
 /* RTP defaults */
 #define DEFAULT_RTP_MTU             1200
-#define DEFAULT_NO_SIGNAL_TIMEOUT   5000000000  /* 5 seconds in nanoseconds */
+#define DEFAULT_NO_SIGNAL_TIMEOUT   5000000     /* 5 seconds in microseconds (monotonic) */
+
+/* Auto-recovery */
+#define INPUT_RESTART_BACKOFF_MS    1000        /* Min spacing between input restarts */
 
 /* ========== Enums ========== */
 
@@ -91,14 +106,19 @@ typedef struct {
     GstElement *output_pipeline;
 
     /* Key elements */
+    GstElement *udpsrc;           /* Borrowed from input_pipeline */
     GstElement *appsink;
     GstElement *appsrc;
 
+    /* Negotiated formats, built once and reused on every (re)build */
+    GstCaps *input_caps;          /* I420 at output size (appsink) */
+    GstCaps *output_caps;         /* input_caps + output framerate (appsrc) */
+
     /* Frame buffer (single frame, mutex protected) */
     GstBuffer *current_frame;
     GstCaps *current_caps;
     GstBuffer *fallback_frame;    /* Pre-allocated grey frame (avoid memory churn) */
-    GstClockTime last_input_time; /* For no-signal timeout detection */
+    gint64 signal_deadline;       /* Monotonic us, re-armed by each input frame (0 = no input yet) */
     GMutex frame_mutex;
 
     /* Render loop */
@@ -108,6 +128,7 @@ typedef struct {
     /* Auto-recovery */
     gboolean input_restart_pending;
     guint restart_timeout_id;
+    gint64 last_restart_time;     /* Monotonic us of the last input restart (0 = never) */
 
     /* Stats */
     guint64 frames_in;
@@ -121,6 +142,8 @@ typedef struct {
     guint64 udp_buffer_size;
     guint64 jitter_buffer_ms;
     guint64 max_queue_time_ms;
+    gboolean rtp_input;           /* MPEG-TS over RTP (rtpjitterbuffer) instead of raw UDP */
+    gboolean hw_decode;           /* Let decodebin3 prefer hardware decoders */
 
     /* Output config */
     gint output_port;
@@ -134,6 +157,7 @@ typedef struct {
     /* Output format */
     OutputCodec codec;
     OutputContainer container;
+    gboolean hw_encode;           /* Prefer hardware encoders, software as fallback */
 
     /* Shared memory config */
     gchar *shm_path;
@@ -147,15 +171,19 @@ typedef struct {
 
     /* Stats config */
     gint stats_interval;
+    guint stats_timeout_id;       /* Main loop timer printing stats (0 = off) */
 
     /* Verbose output */
     gboolean verbose;
 
+    /* CPU list to pin the process to (NULL = scheduler decides) */
+    gchar *cpu_affinity;
+
     GMainLoop *loop;
 } FrameBuffer;
 
 /* ========== Forward Declarations ========== */
-static GstFlowReturn on_new_sample(GstElement *sink, FrameBuffer *fb);
+static GstFlowReturn on_new_sample(GstAppSink *sink, gpointer data);
 static gpointer render_loop(gpointer data);
 static GstBuffer *create_fallback_frame(FrameBuffer *fb);
 static void on_bus_error(GstBus *bus, GstMessage *msg, gpointer data);
@@ -208,6 +236,82 @@ static OutputContainer string_to_container(const char *str) {
     return CONTAINER_RTP;  /* Default */
 }
 
+static gboolean element_available(const char *factory_name) {
+    GstElementFactory *factory = gst_element_factory_find(factory_name);
+    if (!factory) return FALSE;
+    gst_object_unref(factory);
+    return TRUE;
+}
+
+/* ========== UDP Socket Tuning ========== */
+
+/*
+ * udpsrc applies buffer-size through SO_RCVBUF, which the kernel silently clamps to
+ * net.core.rmem_max. Retry with SO_RCVBUFFORCE (Linux, needs CAP_NET_ADMIN) and report
+ * what was actually granted, so an undersized buffer is visible before bursts drop packets.
+ * Must run after the input pipeline reached READY (udpsrc opens its socket there).
+ */
+static void tune_udp_socket(FrameBuffer *fb) {
+    if (fb->udp_buffer_size == 0) return;  /* Kernel default requested */
+
+    if (!fb->udpsrc) return;
+
+    GSocket *socket = NULL;
+    g_object_get(fb->udpsrc, "used-socket", &socket, NULL);
+    if (!socket) return;
+
+    int fd = g_socket_get_fd(socket);
+    int requested = (int)MIN(fb->udp_buffer_size, (guint64)G_MAXINT);
+    int granted = 0;
+    socklen_t len = sizeof(granted);
+
+    getsockopt(fd, SOL_SOCKET, SO_RCVBUF, &granted, &len);
+#ifdef __linux__
+    granted /= 2;  /* Linux reports twice the usable size (bookkeeping overhead) */
+#endif
+
+#ifdef SO_RCVBUFFORCE
+    if (granted < requested &&
+        setsockopt(fd, SOL_SOCKET, SO_RCVBUFFORCE, &requested, sizeof(requested)) == 0) {
+        len = sizeof(granted);
+        getsockopt(fd, SOL_SOCKET, SO_RCVBUF, &granted, &len);
+        granted /= 2;
+    }
+#endif
+
+    if (granted < requested) {
+        g_print("[FrameBuffer] UDP receive buffer: %d of %d bytes granted "
+                "(raise net.core.rmem_max, e.g. sysctl -w net.core.rmem_max=%d)\n",
+                granted, requested, requested);
+    } else if (fb->verbose) {
+        g_print("[FrameBuffer] UDP receive buffer: %d bytes\n", granted);
+    }
+
+    g_object_unref(socket);
+}
+
+/* ========== Bus Sync Filter ========== */
+
+/*
+ * Runs synchronously in the posting thread. Only message types that have a handler
+ * reach the main loop; state-changed, stream-status, QoS, tag, etc. posted by every
+ * child element are dropped here instead of being queued and dispatched as signals.
+ */
+static GstBusSyncReply bus_sync_filter(GstBus *bus, GstMessage *msg, gpointer data) {
+    (void)bus;
+    (void)data;
+
+    switch (GST_MESSAGE_TYPE(msg)) {
+        case GST_MESSAGE_ERROR:
+        case GST_MESSAGE_WARNING:
+        case GST_MESSAGE_EOS:
+        case GST_MESSAGE_STREAM_COLLECTION:
+            return GST_BUS_PASS;
+        default:
+            return GST_BUS_DROP;
+    }
+}
+
 /* ========== Bus Message Handlers ========== */
 static void on_bus_error(GstBus *bus, GstMessage *msg, gpointer data) {
     (void)bus;
@@ -224,9 +328,15 @@ static void on_bus_error(GstBus *bus, GstMessage *msg, gpointer data) {
     /* Auto-restart input pipeline on errors (codec change, stream errors, etc.)
      * This keeps FrameBuffer decoupled from source - it handles errors internally */
     if (strcmp(pipeline_name, "INPUT") == 0 && g_fb && !g_fb->input_restart_pending) {
+        /* Restart on the next main loop iteration; only back off when the previous
+         * restart was recent, so a persistent error cannot spin rebuilding the pipeline */
+        gint64 since_restart_us = g_get_monotonic_time() - g_fb->last_restart_time;
+        guint delay_ms = (g_fb->last_restart_time == 0 ||
+                          since_restart_us >= INPUT_RESTART_BACKOFF_MS * 1000) ? 0 : INPUT_RESTART_BACKOFF_MS;
+
         g_fb->input_restart_pending = TRUE;
-        g_print("[FrameBuffer] Input error detected, scheduling auto-restart in 1s...\n");
-        g_fb->restart_timeout_id = g_timeout_add(1000, restart_input_pipeline, g_fb);
+        g_print("[FrameBuffer] Input error detected, scheduling auto-restart in %ums...\n", delay_ms);
+        g_fb->restart_timeout_id = g_timeout_add(delay_ms, restart_input_pipeline, g_fb);
     }
 
     g_error_free(err);
@@ -240,18 +350,21 @@ static gboolean restart_input_pipeline(gpointer data) {
     FrameBuffer *fb = (FrameBuffer *)data;
 
     g_print("[FrameBuffer] Restarting input pipeline for auto-recovery...\n");
+    fb->last_restart_time = g_get_monotonic_time();
 
     /* Stop old input pipeline */
     if (fb->input_pipeline) {
         gst_element_set_state(fb->input_pipeline, GST_STATE_NULL);
         gst_object_unref(fb->input_pipeline);
         fb->input_pipeline = NULL;
+        fb->udpsrc = NULL;
         fb->appsink = NULL;
     }
 
     /* Create new input pipeline */
     if (create_input_pipeline(fb)) {
         gst_element_set_state(fb->input_pipeline, GST_STATE_PLAYING);
+        tune_udp_socket(fb);
         g_print("[FrameBuffer] Input pipeline restarted successfully\n");
     } else {
         g_printerr("[FrameBuffer] Failed to restart input pipeline!\n");
@@ -282,6 +395,42 @@ static void on_bus_eos(GstBus *bus, GstMessage *msg, gpointer data) {
     g_print("[FrameBuffer] %s: End of stream\n", pipeline_name);
 }
 
+/**
+ * decodebin3 announces every stream its parsebin found in one collection. By default
+ * it decodes one stream of each type; select only the first video stream so audio,
+ * subtitle and data streams in the TS are never decoded (and never left unlinked).
+ */
+static void on_stream_collection(GstBus *bus, GstMessage *msg, gpointer data) {
+    (void)bus;
+    FrameBuffer *fb = (FrameBuffer *)data;
+    GstStreamCollection *collection = NULL;
+
+    gst_message_parse_stream_collection(msg, &collection);
+    if (!collection) return;
+
+    guint n_streams = gst_stream_collection_get_size(collection);
+    const gchar *video_id = NULL;
+    for (guint i = 0; i < n_streams && !video_id; i++) {
+        GstStream *stream = gst_stream_collection_get_stream(collection, i);
+        if (gst_stream_get_stream_type(stream) & GST_STREAM_TYPE_VIDEO) {
+            video_id = gst_stream_get_stream_id(stream);
+        }
+    }
+
+    if (video_id && GST_IS_ELEMENT(GST_MESSAGE_SRC(msg))) {
+        if (fb->verbose) {
+            g_print("[FrameBuffer] Selecting video stream %s (%u streams in input)\n",
+                    video_id, n_streams);
+        }
+        GList *streams = g_list_append(NULL, (gpointer)video_id);
+        gst_element_send_event(GST_ELEMENT(GST_MESSAGE_SRC(msg)),
+                               gst_event_new_select_streams(streams));
+        g_list_free(streams);
+    }
+
+    gst_object_unref(collection);
+}
+
 /* ========== Initialize FrameBuffer with Defaults ========== */
 static FrameBuffer *framebuffer_new(void) {
     FrameBuffer *fb = g_new0(FrameBuffer, 1);
@@ -290,13 +439,15 @@ static FrameBuffer *framebuffer_new(void) {
     fb->current_frame = NULL;
     fb->current_caps = NULL;
     fb->fallback_frame = NULL;      /* Created after we know dimensions */
-    fb->last_input_time = 0;        /* No input yet */
+    fb->signal_deadline = 0;        /* No input yet */
 
     /* Input defaults */
     fb->input_port = DEFAULT_INPUT_PORT;
     fb->udp_buffer_size = DEFAULT_UDP_BUFFER_SIZE;
     fb->jitter_buffer_ms = DEFAULT_JITTER_BUFFER_MS;
     fb->max_queue_time_ms = DEFAULT_MAX_QUEUE_TIME_MS;
+    fb->rtp_input = FALSE;
+    fb->hw_decode = FALSE;
 
     /* Output defaults */
     fb->output_port = DEFAULT_OUTPUT_PORT;
@@ -310,6 +461,7 @@ static FrameBuffer *framebuffer_new(void) {
     /* Output format defaults */
     fb->codec = CODEC_H264;
     fb->container = CONTAINER_MPEGTS;
+    fb->hw_encode = FALSE;
 
     /* Shared memory */
     fb->shm_path = g_strdup(DEFAULT_SHM_PATH);
@@ -327,68 +479,290 @@ static FrameBuffer *framebuffer_new(void) {
     return fb;
 }
 
+/* ========== Build Caps (once, after option parsing) ========== */
+static void build_frame_caps(FrameBuffer *fb) {
+    fb->input_caps = gst_caps_new_simple("video/x-raw",
+        "format", G_TYPE_STRING, "I420",
+        "width", G_TYPE_INT, fb->width,
+        "height", G_TYPE_INT, fb->height,
+        NULL);
+
+    fb->output_caps = gst_caps_copy(fb->input_caps);
+    gst_caps_set_simple(fb->output_caps,
+        "framerate", GST_TYPE_FRACTION, fb->fps, 1,
+        NULL);
+}
+
 /* ========== Create Input Pipeline ========== */
-static gboolean create_input_pipeline(FrameBuffer *fb) {
-    GError *error = NULL;
 
-    guint64 jitter_ns = fb->jitter_buffer_ms * 1000000ULL;
-    guint64 max_time_ns = fb->max_queue_time_ms * 1000000ULL;
+/* Create an element and add it to the bin; on failure, log it and clear *ok */
+static GstElement *add_element(GstElement *bin, const char *factory, const char *name, gboolean *ok) {
+    GstElement *element = gst_element_factory_make(factory, name);
+    if (!element) {
+        g_printerr("[FrameBuffer] Missing GStreamer element: %s\n", factory);
+        *ok = FALSE;
+        return NULL;
+    }
+    gst_bin_add(GST_BIN(bin), element);
+    return element;
+}
 
-    gchar *pipeline_str = g_strdup_printf(
-        "udpsrc port=%d buffer-size=%" G_GUINT64_FORMAT " "
-        "caps=\"video/mpegts,systemstream=true\" name=udpsrc "
-        "! queue min-threshold-time=%" G_GUINT64_FORMAT " "
-        "max-size-buffers=0 max-size-bytes=0 max-size-time=%" G_GUINT64_FORMAT " "
-        "! tsparse "
-        "! decodebin3 "
-        "! videoconvert "
-        "! videoscale add-borders=true "
-        "! video/x-raw,format=I420,width=%d,height=%d "
-        "! appsink name=sink emit-signals=true sync=false max-buffers=%d drop=true",
-        fb->input_port,
-        fb->udp_buffer_size,
-        jitter_ns,
-        max_time_ns,
-        fb->width,
-        fb->height,
-        fb->appsink_max_buffers
-    );
+/* decodebin3 exposes decoded pads at runtime. Same rule as gst_parse_launch delayed
+ * linking: the first caps-compatible pad is linked, other pads fail the caps check */
+static void on_decoder_pad_added(GstElement *decoder, GstPad *pad, gpointer data) {
+    (void)decoder;
+    GstPad *sinkpad = gst_element_get_static_pad(GST_ELEMENT(data), "sink");
 
-    if (fb->verbose) {
-        g_print("[FrameBuffer] Input pipeline: %s\n", pipeline_str);
+    if (!gst_pad_is_linked(sinkpad)) {
+        gst_pad_link(pad, sinkpad);
     }
+    gst_object_unref(sinkpad);
+}
 
-    fb->input_pipeline = gst_parse_launch(pipeline_str, &error);
-    g_free(pipeline_str);
+/*
+ * Built element by element (equivalent launch line below) so properties are set with
+ * their native types and elements are held directly instead of looked up by name:
+ *
+ *   udpsrc [! rtpjitterbuffer ! rtpmp2tdepay] ! queue ! tsparse ! decodebin3
+ *     ! videoconvertscale (or videoconvert ! videoscale) ! appsink
+ */
+static gboolean create_input_pipeline(FrameBuffer *fb) {
+    /*
+     * RTP input: rtpjitterbuffer reorders packets and absorbs network jitter using
+     * RTP sequence numbers/timestamps, so the queue no longer has to hold data back.
+     * Raw MPEG-TS has no sequence numbers: the queue threshold is the jitter buffer.
+     */
+    guint64 jitter_ns = fb->rtp_input ? 0 : fb->jitter_buffer_ms * 1000000ULL;
+    guint64 max_time_ns = fb->max_queue_time_ms * 1000000ULL;
 
-    if (error) {
-        g_printerr("[FrameBuffer] Failed to create input pipeline: %s\n", error->message);
-        g_error_free(error);
+    /* videoconvertscale (GStreamer 1.22+) converts and scales in a single pass over
+     * each frame instead of two; fall back to the separate elements on older installs */
+    gboolean single_pass = element_available("videoconvertscale");
+
+    GstElement *pipeline = gst_pipeline_new("input");
+    gboolean ok = TRUE;
+
+    GstElement *udpsrc = add_element(pipeline, "udpsrc", "udpsrc", &ok);
+    GstElement *jitterbuffer = fb->rtp_input ? add_element(pipeline, "rtpjitterbuffer", NULL, &ok) : NULL;
+    GstElement *depay = fb->rtp_input ? add_element(pipeline, "rtpmp2tdepay", NULL, &ok) : NULL;
+    GstElement *queue = add_element(pipeline, "queue", NULL, &ok);
+    GstElement *tsparse = add_element(pipeline, "tsparse", NULL, &ok);
+    GstElement *decoder = add_element(pipeline, "decodebin3", NULL, &ok);
+    GstElement *convert = add_element(pipeline, single_pass ? "videoconvertscale" : "videoconvert", NULL, &ok);
+    GstElement *scale = single_pass ? convert : add_element(pipeline, "videoscale", NULL, &ok);
+    GstElement *appsink = add_element(pipeline, "appsink", "sink", &ok);
+
+    if (!ok) {
+        g_printerr("[FrameBuffer] Failed to create input pipeline\n");
+        gst_object_unref(pipeline);
         return FALSE;
     }
 
-    fb->appsink = gst_bin_get_by_name(GST_BIN(fb->input_pipeline), "sink");
-    if (!fb->appsink) {
-        g_printerr("[FrameBuffer] Failed to get appsink\n");
+    GstCaps *udp_caps = fb->rtp_input
+        ? gst_caps_new_simple("application/x-rtp",
+              "media", G_TYPE_STRING, "video",
+              "clock-rate", G_TYPE_INT, 90000,
+              "encoding-name", G_TYPE_STRING, "MP2T",
+              NULL)
+        : gst_caps_new_simple("video/mpegts",
+              "systemstream", G_TYPE_BOOLEAN, TRUE,
+              NULL);
+    g_object_set(udpsrc,
+        "port", fb->input_port,
+        "buffer-size", (gint)MIN(fb->udp_buffer_size, (guint64)G_MAXINT),
+        "caps", udp_caps,
+        NULL);
+    gst_caps_unref(udp_caps);
+
+    if (fb->rtp_input) {
+        g_object_set(jitterbuffer,
+            "latency", (guint)fb->jitter_buffer_ms,
+            "drop-on-latency", FALSE,
+            NULL);
+    }
+
+    g_object_set(queue,
+        "min-threshold-time", jitter_ns,
+        "max-size-buffers", 0u,
+        "max-size-bytes", 0u,
+        "max-size-time", max_time_ns,
+        "silent", TRUE,
+        NULL);
+
+    g_object_set(scale, "add-borders", TRUE, NULL);
+
+    /* appsink caps constrain negotiation like a capsfilter. enable-last-sample=false:
+     * basesink would otherwise pin an extra ref to the previous decoded frame (one more
+     * frame held out of the decoder pool) that nothing here ever reads */
+    g_object_set(appsink,
+        "caps", fb->input_caps,
+        "emit-signals", FALSE,
+        "sync", FALSE,
+        "max-buffers", (guint)fb->appsink_max_buffers,
+        "drop", TRUE,
+        "enable-last-sample", FALSE,
+        NULL);
+
+    gboolean linked = fb->rtp_input
+        ? gst_element_link_many(udpsrc, jitterbuffer, depay, queue, tsparse, decoder, NULL)
+        : gst_element_link_many(udpsrc, queue, tsparse, decoder, NULL);
+    linked = linked && (single_pass
+        ? gst_element_link(convert, appsink)
+        : gst_element_link_many(convert, scale, appsink, NULL));
+
+    if (!linked) {
+        g_printerr("[FrameBuffer] Failed to link input pipeline\n");
+        gst_object_unref(pipeline);
         return FALSE;
     }
 
-    g_signal_connect(fb->appsink, "new-sample", G_CALLBACK(on_new_sample), fb);
+    g_signal_connect(decoder, "pad-added", G_CALLBACK(on_decoder_pad_added), convert);
+
+    fb->input_pipeline = pipeline;
+    fb->udpsrc = udpsrc;
+    fb->appsink = appsink;
+
+    if (fb->verbose) {
+        g_print("[FrameBuffer] Input pipeline: udpsrc port=%d %s! queue ! tsparse ! decodebin3 ! %s ! appsink\n",
+                fb->input_port,
+                fb->rtp_input ? "! rtpjitterbuffer ! rtpmp2tdepay " : "",
+                single_pass ? "videoconvertscale" : "videoconvert ! videoscale");
+    }
+
+    /* Direct callback from the streaming thread: no GObject signal emission/marshalling
+     * per frame (emit-signals=false above) */
+    GstAppSinkCallbacks callbacks = { .new_sample = on_new_sample };
+    gst_app_sink_set_callbacks(GST_APP_SINK(fb->appsink), &callbacks, fb, NULL);
 
     GstBus *bus = gst_pipeline_get_bus(GST_PIPELINE(fb->input_pipeline));
+    gst_bus_set_sync_handler(bus, bus_sync_filter, NULL, NULL);
     gst_bus_add_signal_watch(bus);
     g_signal_connect(bus, "message::error", G_CALLBACK(on_bus_error), (gpointer)"INPUT");
     g_signal_connect(bus, "message::warning", G_CALLBACK(on_bus_warning), (gpointer)"INPUT");
     g_signal_connect(bus, "message::eos", G_CALLBACK(on_bus_eos), (gpointer)"INPUT");
+    g_signal_connect(bus, "message::stream-collection", G_CALLBACK(on_stream_collection), fb);
     gst_object_unref(bus);
 
-    g_print("[FrameBuffer] Input: UDP port %d, %" G_GUINT64_FORMAT "ms jitter buffer\n",
-            fb->input_port, fb->jitter_buffer_ms);
+    g_print("[FrameBuffer] Input: %s port %d, %" G_GUINT64_FORMAT "ms jitter buffer\n",
+            fb->rtp_input ? "RTP" : "UDP", fb->input_port, fb->jitter_buffer_ms);
     return TRUE;
 }
 
+/* ========== Hardware Decoders ========== */
+
+/*
+ * Promoted above the software decoders when --hw-decode is set, so decodebin3 picks
+ * them by rank. Listed in order of preference. Only decoders that can hand system-memory frames to videoconvert are
+ * listed (nvv4l2decoder on Jetson outputs NVMM-only and is left out).
+ */
+static const char *hw_decoders[] = {
+    "vtdec_hw", "vtdec",                                                /* macOS VideoToolbox */
+    "nvh264dec", "nvh265dec", "nvmpeg2videodec", "nvvp8dec", "nvvp9dec", /* NVIDIA NVDEC */
+    "vah264dec", "vah265dec", "vampeg2dec", "vavp8dec", "vavp9dec",      /* VA-API (va) */
+    "vaapih264dec", "vaapih265dec", "vaapimpeg2dec", "vaapivp8dec", "vaapivp9dec",
+    "v4l2h264dec", "v4l2h265dec", "v4l2mpeg2dec", "v4l2vp8dec", "v4l2vp9dec", /* V4L2 M2M */
+};
+
+static void promote_hw_decoders(void) {
+    GstRegistry *registry = gst_registry_get();
+    GString *promoted = g_string_new(NULL);
+
+    for (gsize i = 0; i < G_N_ELEMENTS(hw_decoders); i++) {
+        GstPluginFeature *feature = gst_registry_lookup_feature(registry, hw_decoders[i]);
+        if (!feature) continue;
+
+        /* Descending ranks make the array order the preference order (equal ranks
+         * would fall back to alphabetical); never lower an already higher rank */
+        guint rank = GST_RANK_PRIMARY + G_N_ELEMENTS(hw_decoders) - i;
+        if (gst_plugin_feature_get_rank(feature) < rank) {
+            gst_plugin_feature_set_rank(feature, rank);
+        }
+        g_string_append_printf(promoted, " %s", hw_decoders[i]);
+        gst_object_unref(feature);
+    }
+
+    if (promoted->len > 0) {
+        g_print("[FrameBuffer] Hardware decoders preferred:%s\n", promoted->str);
+    } else {
+        g_print("[FrameBuffer] No hardware decoders found, using software decoders\n");
+    }
+    g_string_free(promoted, TRUE);
+}
+
+/* ========== Hardware Encoders ========== */
+
+/*
+ * Probed in order when --hw-encode is set; the first entry whose encoder and converter
+ * are both installed wins (x86 DeepStream ships nvv4l2h264enc without nvvidconv).
+ * Format arguments: bitrate (kbps), keyframe interval.
+ */
+typedef struct {
+    OutputCodec codec;
+    const char *factory;
+    const char *converter;  /* Upload element the format string feeds the encoder through */
+    const char *format;
+} HwEncoder;
+
+static const HwEncoder hw_encoders[] = {
+    /* macOS VideoToolbox */
+    { CODEC_H264, "vtenc_h264", "videoconvert",
+      "videoconvert ! vtenc_h264 realtime=true allow-frame-reordering=false "
+      "bitrate=%d max-keyframe-interval=%d ! h264parse " },
+    { CODEC_H265, "vtenc_h265", "videoconvert",
+      "videoconvert ! vtenc_h265 realtime=true allow-frame-reordering=false "
+      "bitrate=%d max-keyframe-interval=%d ! h265parse " },
+    /* NVIDIA NVENC (desktop/datacenter GPUs): low-latency preset, no reordering delay */
+    { CODEC_H264, "nvh264enc", "videoconvert",
+      "videoconvert ! nvh264enc preset=low-latency-hq zerolatency=true rc-mode=cbr "
+      "bitrate=%d gop-size=%d ! h264parse " },
+    { CODEC_H265, "nvh265enc", "videoconvert",
+      "videoconvert ! nvh265enc preset=low-latency-hq zerolatency=true rc-mode=cbr "
+      "bitrate=%d gop-size=%d ! h265parse " },
+    /* NVIDIA Jetson (bitrate in bps), nvvidconv uploads into NVMM memory */
+    { CODEC_H264, "nvv4l2h264enc", "nvvidconv",
+      "nvvidconv ! nvv4l2h264enc control-rate=constant_bitrate bitrate=%d000 iframeinterval=%d "
+      "insert-sps-pps=true ! h264parse " },
+    { CODEC_H265, "nvv4l2h265enc", "nvvidconv",
+      "nvvidconv ! nvv4l2h265enc control-rate=constant_bitrate bitrate=%d000 iframeinterval=%d "
+      "insert-sps-pps=true ! h265parse " },
+    /* Intel/AMD VA-API (va plugin, then legacy gstreamer-vaapi) */
+    { CODEC_H264, "vah264enc", "videoconvert",
+      "videoconvert ! vah264enc rate-control=cbr bitrate=%d key-int-max=%d ! h264parse " },
+    { CODEC_H265, "vah265enc", "videoconvert",
+      "videoconvert ! vah265enc rate-control=cbr bitrate=%d key-int-max=%d ! h265parse " },
+    { CODEC_H264, "vaapih264enc", "videoconvert",
+      "videoconvert ! vaapih264enc rate-control=cbr bitrate=%d keyframe-period=%d ! h264parse " },
+    { CODEC_H265, "vaapih265enc", "videoconvert",
+      "videoconvert ! vaapih265enc rate-control=cbr bitrate=%d keyframe-period=%d ! h265parse " },
+    /* V4L2 M2M (Raspberry Pi, Jetson, other SoCs) */
+    { CODEC_H264, "v4l2h264enc", "videoconvert",
+      "videoconvert ! v4l2h264enc extra-controls=\"controls,video_bitrate=%d000,h264_i_frame_period=%d\" "
+      "! h264parse " },
+};
+
+static const HwEncoder *find_hw_encoder(OutputCodec codec) {
+    for (gsize i = 0; i < G_N_ELEMENTS(hw_encoders); i++) {
+        if (hw_encoders[i].codec == codec &&
+            element_available(hw_encoders[i].factory) &&
+            element_available(hw_encoders[i].converter)) {
+            return &hw_encoders[i];
+        }
+    }
+    return NULL;
+}
+
 /* ========== Build Encoder String ========== */
 static gchar *build_encoder_string(FrameBuffer *fb) {
+    if (fb->hw_encode && fb->codec != CODEC_RAW) {
+        const HwEncoder *hw = find_hw_encoder(fb->codec);
+        if (hw) {
+            g_print("[FrameBuffer] Hardware encoder: %s\n", hw->factory);
+            return g_strdup_printf(hw->format, fb->bitrate, fb->keyframe_interval);
+        }
+        g_print("[FrameBuffer] No hardware %s encoder found, using software encoder\n",
+                codec_to_string(fb->codec));
+    }
+
     switch (fb->codec) {
         case CODEC_RAW:
             return g_strdup("");  /* No encoder */
@@ -407,18 +781,20 @@ static gchar *build_encoder_string(FrameBuffer *fb) {
                 fb->bitrate, fb->keyframe_interval
             );
 
+        /* VP8/VP9: libvpx auto keyframes fire on scene cuts such as live<->fallback
+         * switches; keyframes are forced by the render loop every -k frames instead */
         case CODEC_VP8:
             return g_strdup_printf(
-                "videoconvert ! vp8enc deadline=%d cpu-used=%d target-bitrate=%d000 keyframe-max-dist=%d ",
+                "videoconvert ! vp8enc deadline=%d cpu-used=%d target-bitrate=%d000 keyframe-mode=disabled ",
                 DEFAULT_VP8_DEADLINE, DEFAULT_VP8_CPU_USED,
-                fb->bitrate, fb->keyframe_interval
+                fb->bitrate
             );
 
         case CODEC_VP9:
             return g_strdup_printf(
-                "videoconvert ! vp9enc deadline=%d cpu-used=%d target-bitrate=%d000 keyframe-max-dist=%d ",
+                "videoconvert ! vp9enc deadline=%d cpu-used=%d target-bitrate=%d000 keyframe-mode=disabled ",
                 DEFAULT_VP9_DEADLINE, DEFAULT_VP9_CPU_USED,
-                fb->bitrate, fb->keyframe_interval
+                fb->bitrate
             );
 
         default:
@@ -508,11 +884,6 @@ static gchar *build_muxer_string(FrameBuffer *fb) {
 
 /* ========== Create Output Pipeline ========== */
 static gboolean create_output_pipeline(FrameBuffer *fb) {
-    gchar *caps_str = g_strdup_printf(
-        "video/x-raw,format=I420,width=%d,height=%d,framerate=%d/1",
-        fb->width, fb->height, fb->fps
-    );
-
     gchar *encoder_str = build_encoder_string(fb);
     gchar *muxer_str = build_muxer_string(fb);
 
@@ -523,37 +894,43 @@ static gboolean create_output_pipeline(FrameBuffer *fb) {
      * CRITICAL FIX (intern review):
      * Always use do-timestamp=false because render_loop calculates precise PTS.
      * If do-timestamp=true, appsrc would overwrite our carefully calculated timestamps.
+     * The queue is bounded to DEFAULT_APPSRC_MAX_BUFFERS frames; if the encoder falls
+     * further behind, leaky-type=downstream drops the oldest queued frame.
      */
-    const char *appsrc_props = "appsrc name=src is-live=true format=time do-timestamp=false min-latency=0";
+    gchar *appsrc_props = g_strdup_printf(
+        "appsrc name=src is-live=true format=time do-timestamp=false min-latency=0 "
+        "max-bytes=0 max-buffers=%d leaky-type=downstream",
+        DEFAULT_APPSRC_MAX_BUFFERS
+    );
 
     gchar *pipeline_str;
     if (fb->container == CONTAINER_SHM && fb->codec == CODEC_RAW) {
         /* SHM with raw frames (muxer_str starts with "!") */
         pipeline_str = g_strdup_printf(
-            "%s caps=\"%s\" %s",
-            appsrc_props, caps_str, muxer_str
+            "%s %s",
+            appsrc_props, muxer_str
         );
     } else if (shm_with_encoding) {
         /* SHM with encoded video */
         pipeline_str = g_strdup_printf(
-            "%s caps=\"%s\" ! %s%s",
-            appsrc_props, caps_str, encoder_str, muxer_str
+            "%s ! %s%s",
+            appsrc_props, encoder_str, muxer_str
         );
     } else if (fb->codec == CODEC_RAW) {
         /* Raw codec (no encoder) - muxer_str starts with "!" */
         pipeline_str = g_strdup_printf(
-            "%s caps=\"%s\" %s",
-            appsrc_props, caps_str, muxer_str
+            "%s %s",
+            appsrc_props, muxer_str
         );
     } else {
         /* Normal output with encoder */
         pipeline_str = g_strdup_printf(
-            "%s caps=\"%s\" ! %s%s",
-            appsrc_props, caps_str, encoder_str, muxer_str
+            "%s ! %s%s",
+            appsrc_props, encoder_str, muxer_str
         );
     }
 
-    g_free(caps_str);
+    g_free(appsrc_props);
     g_free(encoder_str);
     g_free(muxer_str);
 
@@ -572,9 +949,15 @@ static gboolean create_output_pipeline(FrameBuffer *fb) {
     }
 
     fb->appsrc = gst_bin_get_by_name(GST_BIN(fb->output_pipeline), "src");
+    if (!fb->appsrc) {
+        g_printerr("[FrameBuffer] Failed to get appsrc\n");
+        return FALSE;
+    }
+    gst_app_src_set_caps(GST_APP_SRC(fb->appsrc), fb->output_caps);
 
     /* Add bus watchers for output pipeline */
     GstBus *bus = gst_pipeline_get_bus(GST_PIPELINE(fb->output_pipeline));
+    gst_bus_set_sync_handler(bus, bus_sync_filter, NULL, NULL);
     gst_bus_add_signal_watch(bus);
     g_signal_connect(bus, "message::error", G_CALLBACK(on_bus_error), (gpointer)"OUTPUT");
     g_signal_connect(bus, "message::warning", G_CALLBACK(on_bus_warning), (gpointer)"OUTPUT");
@@ -610,8 +993,9 @@ static gboolean create_output_pipeline(FrameBuffer *fb) {
 }
 
 /* ========== New Sample Callback ========== */
-static GstFlowReturn on_new_sample(GstElement *sink, FrameBuffer *fb) {
-    GstSample *sample = gst_app_sink_pull_sample(GST_APP_SINK(sink));
+static GstFlowReturn on_new_sample(GstAppSink *sink, gpointer data) {
+    FrameBuffer *fb = (FrameBuffer *)data;
+    GstSample *sample = gst_app_sink_pull_sample(sink);
     if (!sample) return GST_FLOW_ERROR;
 
     GstBuffer *buffer = gst_sample_get_buffer(sample);
@@ -624,20 +1008,26 @@ static GstFlowReturn on_new_sample(GstElement *sink, FrameBuffer *fb) {
     }
     fb->current_frame = gst_buffer_ref(buffer);
 
-    if (caps && (!fb->current_caps || !gst_caps_is_equal(caps, fb->current_caps))) {
+    /* Pointer compare first: appsink hands out the same caps object for every sample
+     * until renegotiation, so the structural compare only runs when the object changes */
+    if (caps && caps != fb->current_caps) {
         if (fb->current_caps) {
+            if (!gst_caps_is_equal(caps, fb->current_caps)) {
+                /* Log caps change for debugging (input scaled to output size by videoscale) */
+                gchar *caps_str = gst_caps_to_string(caps);
+                g_print("[FrameBuffer] Input caps changed: %s\n", caps_str);
+                g_free(caps_str);
+            }
             gst_caps_unref(fb->current_caps);
-            /* Log caps change for debugging (input scaled to output size by videoscale) */
-            gchar *caps_str = gst_caps_to_string(caps);
-            g_print("[FrameBuffer] Input caps changed: %s\n", caps_str);
-            g_free(caps_str);
         }
+        /* Always adopt the new object so the pointer fast path hits next time */
         fb->current_caps = gst_caps_ref(caps);
     }
 
     fb->frames_in++;
     fb->in_seq++;
-    fb->last_input_time = g_get_monotonic_time() * 1000;  /* Record input time (ns) */
+    /* Re-arm the no-signal watchdog: the render loop only compares against this deadline */
+    fb->signal_deadline = g_get_monotonic_time() + DEFAULT_NO_SIGNAL_TIMEOUT;
 
     g_mutex_unlock(&fb->frame_mutex);
 
@@ -648,19 +1038,17 @@ static GstFlowReturn on_new_sample(GstElement *sink, FrameBuffer *fb) {
 
 /* ========== Create Fallback Frame ========== */
 static GstBuffer *create_fallback_frame(FrameBuffer *fb) {
-    gsize y_size = fb->width * fb->height;
-    gsize uv_size = y_size / 4;
-    gsize total_size = y_size + 2 * uv_size;
+    /* Size from GstVideoInfo so plane strides/padding match what the encoder expects
+     * (I420 rows are 4-byte aligned, chroma rounds up for odd dimensions) */
+    GstVideoInfo info;
+    gst_video_info_set_format(&info, GST_VIDEO_FORMAT_I420, fb->width, fb->height);
 
-    GstBuffer *buffer = gst_buffer_new_allocate(NULL, total_size, NULL);
+    GstBuffer *buffer = gst_buffer_new_allocate(NULL, GST_VIDEO_INFO_SIZE(&info), NULL);
 
+    /* Y=U=V=128 is mid grey: one pass over the whole frame, rendered once and reused */
     GstMapInfo map;
     gst_buffer_map(buffer, &map, GST_MAP_WRITE);
-
-    memset(map.data, 128, y_size);
-    memset(map.data + y_size, 128, uv_size);
-    memset(map.data + y_size + uv_size, 128, uv_size);
-
+    memset(map.data, 128, map.size);
     gst_buffer_unmap(buffer, &map);
 
     return buffer;
@@ -679,8 +1067,10 @@ static gpointer render_loop(gpointer data) {
     }
 
     guint64 frame_count = 0;
-    guint64 stats_frames = (fb->stats_interval > 0) ? fb->fps * fb->stats_interval : 0;
     gboolean signal_lost_logged = FALSE;
+    gboolean force_keyframes = (fb->codec == CODEC_VP8 || fb->codec == CODEC_VP9) &&
+                               fb->keyframe_interval > 0;
+    GstClockTime pts = 0;  /* Running time of frame_count, carried between iterations */
 
     while (fb->running) {
         GstBuffer *buffer_to_push = NULL;
@@ -693,23 +1083,23 @@ static gpointer render_loop(gpointer data) {
          * Use gst_util_uint64_scale_int instead of frame_count * duration.
          * This prevents integer rounding errors from accumulating over weeks/months.
          * Formula: (frame_count * GST_SECOND) / fps - calculated exactly each time.
+         * Each frame boundary is computed once: next_pts is also this iteration's wait
+         * target and becomes the next iteration's pts.
          */
-        GstClockTime pts = gst_util_uint64_scale_int(frame_count, GST_SECOND, fb->fps);
         GstClockTime next_pts = gst_util_uint64_scale_int(frame_count + 1, GST_SECOND, fb->fps);
         GstClockTime duration = next_pts - pts;
 
         g_mutex_lock(&fb->frame_mutex);
 
-        /* Check for no-signal timeout: if last input was more than 5 seconds ago
-         * g_get_monotonic_time() returns microseconds, convert to nanoseconds */
-        gint64 now_us = g_get_monotonic_time();
-        GstClockTime now_ns = (GstClockTime)now_us * 1000;
-        gboolean signal_timeout = (fb->last_input_time > 0) &&
-                                  ((now_ns - fb->last_input_time) > DEFAULT_NO_SIGNAL_TIMEOUT);
+        /* Check for no-signal timeout: the deadline is armed by on_new_sample, so the
+         * render loop does a single compare. Stays in g_get_monotonic_time() microseconds
+         * end to end (no unit conversion, immune to wall-clock/NTP jumps) */
+        gboolean signal_timeout = (fb->signal_deadline > 0) &&
+                                  (g_get_monotonic_time() > fb->signal_deadline);
 
         if (fb->current_frame && !signal_timeout) {
-            /* Normal case: we have a valid, recent frame */
-            buffer_to_push = gst_buffer_copy(fb->current_frame);
+            /* Normal case: we have a valid, recent frame (just take a ref under the lock) */
+            buffer_to_push = gst_buffer_ref(fb->current_frame);
             current_seq = fb->in_seq;
             signal_lost_logged = FALSE;
         } else {
@@ -724,13 +1114,21 @@ static gpointer render_loop(gpointer data) {
 
         g_mutex_unlock(&fb->frame_mutex);
 
+        /* Zero-copy: pixel memory is shared with the decoded frame. make_writable only
+         * duplicates the GstBuffer header (and only if the input still holds a ref), so
+         * timestamps below never touch the buffer on_new_sample stored */
+        if (!use_fallback) {
+            buffer_to_push = gst_buffer_make_writable(buffer_to_push);
+        }
+
         /* Use pre-allocated fallback frame (copy to avoid ownership issues) */
         if (use_fallback) {
             if (fb->fallback_frame) {
                 buffer_to_push = gst_buffer_copy(fb->fallback_frame);
             } else {
-                /* Fallback not yet created - create one (should not happen normally) */
-                buffer_to_push = create_fallback_frame(fb);
+                /* Fallback not yet created (should not happen normally): create and keep it */
+                fb->fallback_frame = create_fallback_frame(fb);
+                buffer_to_push = gst_buffer_copy(fb->fallback_frame);
             }
         }
 
@@ -742,6 +1140,14 @@ static gpointer render_loop(gpointer data) {
             fb->last_pushed_seq = current_seq;
         }
 
+        /* Fixed keyframe cadence for VP8/VP9 (keyframe-mode=disabled on the encoder).
+         * The encoder matches the event by running time, which equals our PTS */
+        if (force_keyframes && frame_count % fb->keyframe_interval == 0) {
+            gst_element_send_event(fb->appsrc,
+                gst_video_event_new_downstream_force_key_unit(
+                    pts, GST_CLOCK_TIME_NONE, pts, TRUE, (guint)(frame_count / fb->keyframe_interval)));
+        }
+
         /* Apply timestamps (do-timestamp=false on appsrc, we are clock master) */
         GST_BUFFER_PTS(buffer_to_push) = pts;
         GST_BUFFER_DTS(buffer_to_push) = pts;
@@ -762,21 +1168,15 @@ static gpointer render_loop(gpointer data) {
         if (is_repeat) fb->frames_repeated++;
         frame_count++;
 
-        if (stats_frames > 0 && (frame_count % stats_frames) == 0) {
-            g_print("[FrameBuffer] Stats: in=%" G_GUINT64_FORMAT
-                    " out=%" G_GUINT64_FORMAT
-                    " repeated=%" G_GUINT64_FORMAT "\n",
-                    fb->frames_in, fb->frames_out, fb->frames_repeated);
-        }
-
         /* Wait for next frame using same drift-free calculation
          * Re-read base_time each iteration to handle PAUSED→PLAYING transitions */
         GstClockTime base_time = gst_element_get_base_time(GST_ELEMENT(fb->output_pipeline));
-        GstClockTime target_running_time = gst_util_uint64_scale_int(frame_count, GST_SECOND, fb->fps);
-        GstClockTime target_time = base_time + target_running_time;
+        GstClockTime target_time = base_time + next_pts;  /* == scale(frame_count) after increment */
         GstClockID clk_id = gst_clock_new_single_shot_id(clock, target_time);
         gst_clock_id_wait(clk_id, NULL);
         gst_clock_id_unref(clk_id);
+
+        pts = next_pts;
     }
 
     gst_object_unref(clock);
@@ -785,6 +1185,20 @@ static gpointer render_loop(gpointer data) {
     return NULL;
 }
 
+/* ========== Stats (Main Loop Timer) ========== */
+
+/* Printed from the main loop so the render thread never blocks on stdout */
+static gboolean print_stats(gpointer data) {
+    FrameBuffer *fb = (FrameBuffer *)data;
+
+    g_print("[FrameBuffer] Stats: in=%" G_GUINT64_FORMAT
+            " out=%" G_GUINT64_FORMAT
+            " repeated=%" G_GUINT64_FORMAT "\n",
+            fb->frames_in, fb->frames_out, fb->frames_repeated);
+
+    return G_SOURCE_CONTINUE;
+}
+
 /* ========== Pipeline Start (Idle Callback) ========== */
 static gboolean start_pipelines_idle(gpointer data) {
     FrameBuffer *fb = (FrameBuffer *)data;
@@ -803,6 +1217,11 @@ static gboolean start_pipelines_idle(gpointer data) {
     fb->render_thread = g_thread_new("render-loop", render_loop, fb);
 
     gst_element_set_state(fb->input_pipeline, GST_STATE_PLAYING);
+    tune_udp_socket(fb);
+
+    if (fb->stats_interval > 0) {
+        fb->stats_timeout_id = g_timeout_add_seconds(fb->stats_interval, print_stats, fb);
+    }
 
     g_print("[FrameBuffer] Running\n");
 
@@ -820,6 +1239,11 @@ static gboolean framebuffer_start(FrameBuffer *fb) {
 static void framebuffer_stop(FrameBuffer *fb) {
     g_print("[FrameBuffer] Stopping...\n");
 
+    if (fb->stats_timeout_id) {
+        g_source_remove(fb->stats_timeout_id);
+        fb->stats_timeout_id = 0;
+    }
+
     fb->running = FALSE;
 
     if (fb->render_thread) {
@@ -837,15 +1261,72 @@ static void framebuffer_stop(FrameBuffer *fb) {
 static void framebuffer_free(FrameBuffer *fb) {
     if (fb->current_frame) gst_buffer_unref(fb->current_frame);
     if (fb->current_caps) gst_caps_unref(fb->current_caps);
+    if (fb->input_caps) gst_caps_unref(fb->input_caps);
+    if (fb->output_caps) gst_caps_unref(fb->output_caps);
     if (fb->fallback_frame) gst_buffer_unref(fb->fallback_frame);
     if (fb->input_pipeline) gst_object_unref(fb->input_pipeline);
     if (fb->output_pipeline) gst_object_unref(fb->output_pipeline);
     g_free(fb->output_host);
     g_free(fb->shm_path);
+    g_free(fb->cpu_affinity);
     g_mutex_clear(&fb->frame_mutex);
     g_free(fb);
 }
 
+/* ========== CPU Affinity ========== */
+
+/*
+ * Pin the process to a CPU list such as "0-3" or "2,3,6-7". Must run before the
+ * pipelines start: the render loop, GStreamer streaming threads and encoder workers
+ * inherit the mask, so per-frame data stays in the same cores' caches instead of
+ * following threads the scheduler migrates.
+ */
+static gboolean apply_cpu_affinity(const char *list) {
+#ifdef __linux__
+    cpu_set_t set;
+    CPU_ZERO(&set);
+
+    gchar **ranges = g_strsplit(list, ",", -1);
+    gboolean valid = TRUE;
+    for (gchar **range = ranges; *range && valid; range++) {
+        gchar *end = NULL;
+        guint64 first = g_ascii_strtoull(*range, &end, 10);
+        guint64 last = first;
+
+        if (end == *range) {
+            valid = FALSE;
+            break;
+        }
+        if (*end == '-') {
+            gchar *start = end + 1;
+            last = g_ascii_strtoull(start, &end, 10);
+            if (end == start) valid = FALSE;
+        }
+        if (*end != '\0' || last < first || last >= CPU_SETSIZE) valid = FALSE;
+
+        for (guint64 cpu = first; valid && cpu <= last; cpu++) {
+            CPU_SET(cpu, &set);
+        }
+    }
+    g_strfreev(ranges);
+
+    if (!valid || CPU_COUNT(&set) == 0) {
+        g_printerr("[FrameBuffer] Invalid CPU list: %s\n", list);
+        return FALSE;
+    }
+    if (sched_setaffinity(0, sizeof(set), &set) != 0) {
+        g_printerr("[FrameBuffer] Failed to set CPU affinity: %s\n", g_strerror(errno));
+        return FALSE;
+    }
+
+    g_print("[FrameBuffer] Pinned to CPUs %s\n", list);
+    return TRUE;
+#else
+    g_print("[FrameBuffer] CPU affinity not supported on this platform, ignoring %s\n", list);
+    return TRUE;
+#endif
+}
+
 /* ========== Signal Handler ========== */
 static void signal_handler(int sig) {
     g_print("\n[FrameBuffer] Signal %d received, shutting down...\n", sig);
@@ -864,6 +1345,8 @@ static void print_usage(const char *prog) {
     g_print("  -B, --udp-buffer SIZE      UDP socket buffer in bytes (default: %d)\n", DEFAULT_UDP_BUFFER_SIZE);
     g_print("  -j, --jitter-buffer MS     Jitter buffer in milliseconds (default: %d)\n", DEFAULT_JITTER_BUFFER_MS);
     g_print("  -Q, --max-queue MS         Max queue time in milliseconds (default: %d)\n", DEFAULT_MAX_QUEUE_TIME_MS);
+    g_print("  -R, --rtp-input            Input is MPEG-TS over RTP (uses rtpjitterbuffer)\n");
+    g_print("  -D, --hw-decode            Prefer hardware decoders when available\n");
     g_print("\n");
 
     g_print("OUTPUT OPTIONS:\n");
@@ -880,6 +1363,7 @@ static void print_usage(const char *prog) {
     g_print("  -c, --codec CODEC          Output codec: raw, h264, h265, vp8, vp9 (default: h264)\n");
     g_print("  -C, --container CONT       Container: rtp, mpegts, shm, raw, file (default: mpegts)\n");
     g_print("  -F, --file PATH            Output file path (auto-sets container to file)\n");
+    g_print("  -A, --hw-encode            Use a hardware H.264/H.265 encoder if available\n");
     g_print("\n");
 
     g_print("SHARED MEMORY OPTIONS (when -C shm):\n");
@@ -889,6 +1373,7 @@ static void print_usage(const char *prog) {
 
     g_print("OTHER OPTIONS:\n");
     g_print("  -S, --stats-interval SEC   Stats print interval, 0=off (default: %d)\n", DEFAULT_STATS_INTERVAL_SEC);
+    g_print("  -a, --cpu-affinity LIST    Pin to CPUs, e.g. 0-3 or 2,3 (Linux only)\n");
     g_print("  -V, --verbose              Verbose output (show pipeline strings)\n");
     g_print("      --help                 Show this help\n");
     g_print("      --version              Show version\n");
@@ -917,6 +1402,7 @@ static void print_usage(const char *prog) {
     g_print("  %s -i 5000 -c h264 -C rtp -w 1920 -h 1080     # H.264/RTP 1080p\n", prog);
     g_print("  %s -i 5000 -F output.mp4                      # Record to MP4 file\n", prog);
     g_print("  %s -i 5000 -c vp9 -F output.mkv               # Record VP9 to MKV\n", prog);
+    g_print("  %s -i 5000 -A                                 # Hardware H.264/MPEG-TS\n", prog);
 }
 
 static void print_version(void) {
@@ -935,6 +1421,8 @@ int main(int argc, char *argv[]) {
         {"udp-buffer",    required_argument, 0, 'B'},
         {"jitter-buffer", required_argument, 0, 'j'},
         {"max-queue",     required_argument, 0, 'Q'},
+        {"rtp-input",     no_argument,       0, 'R'},
+        {"hw-decode",     no_argument,       0, 'D'},
         {"output-port",   required_argument, 0, 'o'},
         {"host",          required_argument, 0, 'H'},
         {"width",         required_argument, 0, 'w'},
@@ -947,7 +1435,9 @@ int main(int argc, char *argv[]) {
         {"shm-path",      required_argument, 0, 'p'},
         {"shm-size",      required_argument, 0, 'Z'},
         {"file",          required_argument, 0, 'F'},
+        {"hw-encode",     no_argument,       0, 'A'},
         {"stats-interval",required_argument, 0, 'S'},
+        {"cpu-affinity",  required_argument, 0, 'a'},
         {"verbose",       no_argument,       0, 'V'},
         {"help",          no_argument,       0, '?'},
         {"version",       no_argument,       0, 'E'},
@@ -957,7 +1447,7 @@ int main(int argc, char *argv[]) {
     int opt;
     int option_index = 0;
 
-    while ((opt = getopt_long(argc, argv, "i:B:j:Q:o:H:w:h:f:b:k:c:C:p:Z:F:S:V",
+    while ((opt = getopt_long(argc, argv, "i:B:j:Q:RDo:H:w:h:f:b:k:c:C:p:Z:F:AS:a:V",
                               long_options, &option_index)) != -1) {
         switch (opt) {
             case 'i':
@@ -972,6 +1462,12 @@ int main(int argc, char *argv[]) {
             case 'Q':
                 fb->max_queue_time_ms = strtoull(optarg, NULL, 10);
                 break;
+            case 'R':
+                fb->rtp_input = TRUE;
+                break;
+            case 'D':
+                fb->hw_decode = TRUE;
+                break;
             case 'o':
                 fb->output_port = atoi(optarg);
                 break;
@@ -1011,9 +1507,16 @@ int main(int argc, char *argv[]) {
                 fb->output_file = g_strdup(optarg);
                 fb->container = CONTAINER_FILE;  /* Auto-set container to file */
                 break;
+            case 'A':
+                fb->hw_encode = TRUE;
+                break;
             case 'S':
                 fb->stats_interval = atoi(optarg);
                 break;
+            case 'a':
+                g_free(fb->cpu_affinity);
+                fb->cpu_affinity = g_strdup(optarg);
+                break;
             case 'V':
                 fb->verbose = TRUE;
                 break;
@@ -1031,9 +1534,19 @@ int main(int argc, char *argv[]) {
     g_print("SoftwareFrameBuffer v%s\n", VERSION);
     g_print("========================================\n");
 
+    if (fb->cpu_affinity && !apply_cpu_affinity(fb->cpu_affinity)) {
+        return 1;
+    }
+
     signal(SIGINT, signal_handler);
     signal(SIGTERM, signal_handler);
 
+    if (fb->hw_decode) {
+        promote_hw_decoders();
+    }
+
+    build_frame_caps(fb);
+
     if (!create_input_pipeline(fb)) {
         g_printerr("Failed to create input pipeline\n");
         return 1;